@@ -1,26 +1,25 @@
-from openai import OpenAI
 from pydantic import BaseModel
-from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 from ..utils.code_execution import DataAnalysisSession, extract_python
 from ..utils.prompt import _response_to_text
-import pandas as pd 
+from ..utils.admission import llm_limiter, sandbox_limiter
+from ..utils.config import get_openai_client
+from ..utils.profiling import profile_file
 import os 
 
 # this agent will also be responsible for creating charts and visuals when they seem needed. 
 
-load_dotenv() 
-client = OpenAI() 
-
 PROMPT = """
 You are Atlas' dedicated Python coding agent.
 
 Core rules:
 - Input comes from the orchestrator and local files already in the working directory. NEVER download from URLs or the internet.
 - ONLY load data if the query requires data analysis. For pure calculations (math, algorithms, etc.), do NOT load any datasets.
-- When data loading IS needed: use pandas; on first read, sample with nrows (e.g., 200); print shape, dtypes, head(5), and tail(5).
+- When data loading IS needed: use pandas; on first read, sample with nrows (e.g., 200); print shape and dtypes, then `display(df.head(5))` and `display(df.tail(5))`.
 - Validate upfront: check file existence; assert required columns before use; handle missing values explicitly.
 - Output requirements: print ONLY what's relevant to answer the query. Keep output minimal and focused.
-- For charts, ALSO emit an inline Markdown image using a base64 data URL so the frontend can render it: encode the PNG buffer with base64 and print `![chart](data:image/png;base64,<...>)`.
+- For charts, use matplotlib and call `plt.show()`; the figure is captured automatically. Do NOT base64-encode images or print them as Markdown.
+- For tabular results, `display(df.head(n))` the DataFrame instead of printing it; large tables are truncated for you.
 - Code style: respond with a single fenced ```python``` block only (no prose outside). Prefer small helper functions; keep code concise and readable.
 - Safety and performance: avoid long-running operations or heavy memory use; do not mutate source files; avoid network calls.
 - Errors: raise descriptive errors when expected columns/files are missing; fail fast with helpful messages.
@@ -32,7 +31,7 @@ import pandas as pd
 df = pd.read_csv("data.csv", nrows=200)
 print("Shape:", df.shape)
 print("Dtypes:", df.dtypes.to_dict())
-print(df.head())
+display(df.head())
 
 # analysis
 ...
@@ -67,7 +66,7 @@ def get_python_response(query: str) -> str:
     if query and isinstance(query, str):
         pass  # placeholder to keep original query unmodified below
 
-    response = client.responses.create(
+    response = get_openai_client().responses.create(
         model="gpt-5.1",
         instructions=PROMPT,
         input=query,
@@ -82,14 +81,36 @@ def get_python_response(query: str) -> str:
 
     return python_code_string
 
+def _profile_summary(profile: dict) -> list:
+    """Summary lines from a cached full-file profile (see utils/profiling.py)."""
+    cols = profile["columns"]
+    col_list = ", ".join(cols[:50]) + (" ..." if len(cols) > 50 else "")
+    nulls = {c: n for c, n in profile["nulls"].items() if n}
+    ranges = {c: [profile["min"][c], profile["max"][c]] for c in profile["min"]}
+    return [
+        f"Shape: ({profile['rows']}, {len(cols)})",
+        f"Columns ({len(cols)}): {col_list}",
+        f"Dtypes: {profile['dtypes']}",
+        f"Null counts: {nulls or 'none'}",
+        f"Numeric ranges [min, max]: {ranges}",
+        f"Sample rows (head 2): {profile['sample'][:2]}",
+    ]
+
 # add below get_python_response
 def _summarize_files(files_to_upload: dict) -> str:
     """Build a short, safe summary of uploaded tabular files."""
+    # pandas is imported here rather than at module level to keep API cold starts fast
+    import pandas as pd
+
     summaries = []
     for sandbox_name, source_path in (files_to_upload or {}).items():
         meta = [f"File: {sandbox_name}", f"Local path: {source_path}"]
         try:
             ext = os.path.splitext(source_path)[1].lower()
+            if ext == ".csv" and os.path.exists(source_path):
+                meta.extend(_profile_summary(profile_file(source_path)))
+                summaries.append("\n".join(meta))
+                continue
             if ext in [".xls", ".xlsx"]:
                 df = pd.read_excel(source_path, nrows=50)
             else:
@@ -107,7 +128,7 @@ def _summarize_files(files_to_upload: dict) -> str:
         summaries.append("\n".join(meta))
     return "\n\n".join(summaries)
 
-def coding_agent(query, files_to_upload: dict = None):
+def _build_query(query, files_to_upload: dict = None) -> str:
     # When files are provided, append guidance so the model reads local copies.
     if files_to_upload:
         file_list = ", ".join(files_to_upload.keys())
@@ -122,17 +143,39 @@ def coding_agent(query, files_to_upload: dict = None):
         print("-"*40)
         print(f"QUERY: \n{query}\n")
         print("-"*40)
+    return query
 
+def _run_in_sandbox(python_string: str, files_to_upload: dict = None):
     # this may be inefficient creating a new session every time you execute -> look into better solution 
-    python_string = get_python_response(query)
     session = DataAnalysisSession()
-    session.init_session(files=files_to_upload or {})
-    stdout, stderr = session.execute_code(python_string)
+    try:
+        session.init_session(files=files_to_upload or {})
+        stdout, stderr, artifacts = session.execute_code(python_string)
+    finally:
+        session.close()
     print(f"LLM Answer given code: \n{python_string}")
     print("-" * 40)
     print("STDOUT:", stdout)
     print("STDERR:", stderr)
+    print("ARTIFACTS:", [type(a).__name__ for a in artifacts])
     print("-" * 40)
-    session.close()
+    return stdout, stderr, artifacts
 
-    return (stdout, stderr, python_string)
\ No newline at end of file
+def coding_agent(query, files_to_upload: dict = None):
+    """Synchronous, unadmitted run (scripts / manual testing)."""
+    python_string = get_python_response(_build_query(query, files_to_upload))
+    stdout, stderr, artifacts = _run_in_sandbox(python_string, files_to_upload)
+    return (stdout, stderr, python_string, artifacts)
+
+async def run_coding_agent(query, files_to_upload: dict = None, user_id: str = None):
+    """
+    Admission-controlled coding agent for the API. The code-generation call
+    takes an LLM slot and the execution a sandbox slot; raises SystemBusy when
+    either is saturated. Blocking work runs in the threadpool only once admitted.
+    """
+    query = await run_in_threadpool(_build_query, query, files_to_upload)
+    async with llm_limiter.slot(user_id):
+        python_string = await run_in_threadpool(get_python_response, query)
+    async with sandbox_limiter.slot(user_id):
+        stdout, stderr, artifacts = await run_in_threadpool(_run_in_sandbox, python_string, files_to_upload)
+    return (stdout, stderr, python_string, artifacts)
@@ -1,11 +1,8 @@
-from openai import OpenAI 
-from openai.types.shared import reasoning_effort
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from ..utils.prompt import _response_to_text
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI()
+from ..utils.config import get_openai_client
+from ..utils.admission import llm_limiter
 
 PROMPT = """
 You are Atlas' Research Agent with real-time web search access.
@@ -28,7 +25,7 @@ Workflow:
 
 def research_agent(query: str) -> str:
 
-    response = client.responses.create(
+    response = get_openai_client().responses.create(
         model="gpt-5.1",
         reasoning={"effort": "none"},
         instructions=PROMPT,
@@ -40,3 +37,8 @@ def research_agent(query: str) -> str:
 
     return response_string
 
+
+async def run_research_agent(query: str, user_id: str = None) -> str:
+    """Admission-controlled research_agent; raises SystemBusy when LLM slots are saturated."""
+    async with llm_limiter.slot(user_id):
+        return await run_in_threadpool(research_agent, query)
@@ -1,26 +1,33 @@
 import os
 import json
 import re
+import base64
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from pydantic import BaseModel
-from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Request as HTTPRequest
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from openai import OpenAI
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from .utils.prompt import ClientMessage, convert_to_openai_messages, extract_files_from_messages
-from .agents.coding_agent import coding_agent 
-from .agents.research_agent import research_agent
+from .agents.coding_agent import run_coding_agent
+from .agents.research_agent import run_research_agent
+from .utils.admission import SystemBusy, llm_limiter, admission_stats, ensure_threadpool_capacity
+from .utils.code_execution import ImageArtifact, TableArtifact
+from .utils.config import get_openai_client
+from .utils.profiling import profile_file
 
 import shutil
 import os
 import glob 
 
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app):
+    ensure_threadpool_capacity()
+    yield
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount the uploads directory to serve files statically
 # Ensure the directory exists
@@ -41,11 +48,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-client = OpenAI(
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
-
-
 class Request(BaseModel):
     messages: List[ClientMessage]
 
@@ -115,112 +117,192 @@ def strip_base64_images(text: str) -> str:
     
     return re.sub(pattern, replace_fn, text)
 
-def stream_text(messages: List[dict], files_dict: dict = None):
+def _format_cell(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return "" if value is None else str(value)
+
+def render_table(table: TableArtifact) -> str:
+    """Render a TableArtifact as aligned plain text (like a printed DataFrame)."""
+    header = [""] + table.columns if table.index else list(table.columns)
+    body = []
+    for i, row in enumerate(table.rows):
+        cells = [_format_cell(v) for v in row]
+        body.append([_format_cell(table.index[i])] + cells if table.index else cells)
+    widths = [max(len(r[c]) for r in [header] + body) for c in range(len(header))]
+    lines = ["  ".join(cell.rjust(w) for cell, w in zip(r, widths)) for r in [header] + body]
+    if table.truncated:
+        lines.append(f"... {table.total_rows - len(table.rows)} more rows ({table.total_rows} total)")
+    return "\n".join(lines)
+
+def render_artifacts(artifacts: list, for_model: bool = False) -> str:
+    """
+    Render sandbox artifacts at the edge. The client gets charts as inline
+    base64 Markdown images (what the frontend renders); the model only gets a
+    placeholder so it never sees image bytes.
+    """
+    parts = []
+    for artifact in artifacts or []:
+        if isinstance(artifact, ImageArtifact):
+            if for_model:
+                parts.append(f"[Chart generated: {artifact.alt}]")
+            else:
+                encoded = base64.b64encode(artifact.data).decode("ascii")
+                parts.append(f"![{artifact.alt}](data:{artifact.mime};base64,{encoded})")
+        elif isinstance(artifact, TableArtifact):
+            parts.append(render_table(artifact))
+        else:
+            parts.append(str(artifact))
+    return "\n\n".join(parts)
+
+BUSY_MESSAGE = "Atlas is busy right now. Please try again in a moment."
+
+def busy_event(exc: SystemBusy) -> str:
+    """
+    Terminal stream events telling the client to back off and retry. The "3:"
+    error part makes useChat call onError; the "e:" part carries the busy
+    details for other clients.
+    """
+    return '3:{msg}\ne:{{"finishReason":"error","busy":true,"resource":{res},"message":{msg}}}\n'.format(
+        res=json.dumps(exc.resource),
+        msg=json.dumps(BUSY_MESSAGE),
+    )
+
+def _stream_turn(model_name: str, input_list: list, result: dict):
+    """
+    One blocking Responses stream, run in the threadpool by _stream_text.
+    Yields client stream lines; leaves the final response in result["response"].
+    """
+    with get_openai_client().responses.stream(
+        model=model_name,
+        instructions=instructions,
+        input=input_list,
+        reasoning={"effort": "none"},
+        tools=tools
+    ) as stream:
+        for event in stream:
+            et = getattr(event, "type", None)
+            print(f"EVENT TYPE: {et}", flush=True)
+            # Stream plain text deltas
+            if et == "response.output_text.delta":
+                yield "0:{text}\n".format(text=json.dumps(event.delta))
+
+            # Optional: surface model/tool errors mid-stream
+            elif et == "response.error":
+                print(f"❌ ERROR: {event}", flush=True)
+                err = getattr(event, "error", {}) or {}
+                msg = err.get("message", "unknown error")
+                yield 'e:{{"finishReason":"error","message":{msg}}}\n'.format(
+                    msg=json.dumps(msg)
+                )
+
+        # When the stream completes, you can fetch the final structured response
+        final_response = result["response"] = stream.get_final_response()
+        # Collect any web_search citations into a Sources dropdown
+        sources = []
+        for output in getattr(final_response, "output", []) or []:
+            for content in getattr(output, "content", []) or []:
+                for ann in getattr(content, "annotations", []) or []:
+                    if getattr(ann, "type", None) == "url_citation":
+                        url = getattr(ann, "url", None)
+                        title = getattr(ann, "title", None)
+                        if url:
+                            sources.append({"url": url, "title": title})
+        # Deduplicate by URL preserving first title
+        deduped = []
+        seen = set()
+        for s in sources:
+            if s["url"] in seen:
+                continue
+            seen.add(s["url"])
+            deduped.append(s)
+        if sources:
+            sources_json = json.dumps(deduped)
+            sources_md = (
+                "<details><summary>Sources</summary>\n\n"
+                "```json\n"
+                f"{sources_json}\n"
+                "```\n"
+                "</details>\n"
+            )
+            yield "0:{text}\n".format(text=json.dumps(sources_md))
+
+async def stream_text(messages: List[dict], files_dict: dict = None, user_id: str = None):
+    try:
+        async for line in _stream_text(messages, files_dict, user_id):
+            yield line
+    except SystemBusy as exc:
+        print(f"⏳ BUSY: {exc}", flush=True)
+        yield busy_event(exc)
+
+async def _stream_text(messages: List[dict], files_dict: dict = None, user_id: str = None):
     # Pick a valid model. Examples: "gpt-5.1" (reasoning) or "gpt-4o-mini" (fast/cheap)
     model_name = "gpt-5.1"
     input_list = messages.copy()
+    final_response = None
 
     max_iteration = 5
     iteration = 0
     while iteration < max_iteration:
         has_function_call = False 
-        # Stream with tools enabled
-        with client.responses.stream(
-            model=model_name,
-            instructions=instructions,
-            input=input_list,
-            reasoning={"effort": "none"},
-            tools=tools
-        ) as stream:
-            for event in stream:
-                et = getattr(event, "type", None)
-                print(f"EVENT TYPE: {et}", flush=True)
-                # Stream plain text deltas
-                if et == "response.output_text.delta":
-                    yield "0:{text}\n".format(text=json.dumps(event.delta))
-
-                # Optional: surface model/tool errors mid-stream
-                elif et == "response.error":
-                    print(f"❌ ERROR: {event}", flush=True)
-                    err = getattr(event, "error", {}) or {}
-                    msg = err.get("message", "unknown error")
-                    yield 'e:{{"finishReason":"error","message":{msg}}}\n'.format(
-                        msg=json.dumps(msg)
-                    )
-
-            # When the stream completes, you can fetch the final structured response
-            final_response = stream.get_final_response()
-            # Collect any web_search citations into a Sources dropdown
-            sources = []
-            for output in getattr(final_response, "output", []) or []:
-                for content in getattr(output, "content", []) or []:
-                    for ann in getattr(content, "annotations", []) or []:
-                        if getattr(ann, "type", None) == "url_citation":
-                            url = getattr(ann, "url", None)
-                            title = getattr(ann, "title", None)
-                            if url:
-                                sources.append({"url": url, "title": title})
-            # Deduplicate by URL preserving first title
-            deduped = []
-            seen = set()
-            for s in sources:
-                if s["url"] in seen:
-                    continue
-                seen.add(s["url"])
-                deduped.append(s)
-            if sources:
-                sources_json = json.dumps(deduped)
-                sources_md = (
-                    "<details><summary>Sources</summary>\n\n"
-                    "```json\n"
-                    f"{sources_json}\n"
-                    "```\n"
-                    "</details>\n"
-                )
-                yield "0:{text}\n".format(text=json.dumps(sources_md))
-            input_list += final_response.output
-            # function calls 
-            for item in final_response.output:
-                if item.type == "function_call":
-                    has_function_call = True 
-                    args = json.loads(item.arguments)
-                    analysis_query = args.get("query")
-                        
-                    if item.name == "coding_agent":
-                        stdout, stderr, code_str = coding_agent(analysis_query, files_dict)
-
-                        output_section = "\n".join(stdout) if stdout else ""
-                        if stderr:
-                            output_section += ("\n\nErrors:\n" if output_section else "Errors:\n") + "\n".join(stderr)
-
-                        # Strip base64 images for MODEL context to save tokens
-                        # The orchestrator doesn't need to see massive base64 strings
-                        output_for_model = strip_base64_images(output_section)
-                        result_text_for_context = f"Output:\n{output_for_model}\n\nCode Executed:\n{code_str}"
-
-                        # Inject the FULL code block (with base64) into the CLIENT stream
-                        # This makes it appear in the chat UI with charts intact
-                        # Format: python-exec with delimiter to pass both code and output
-                        if code_str:
-                            # Combine code and output with simple delimiter (FULL output with images)
-                            combined = f"{code_str.strip()}\n---OUTPUT---\n{output_section.strip()}"
-                            code_block_markdown = f"\n```python-exec\n{combined}\n```\n\n"
-                            yield '0:{text}\n'.format(text=json.dumps(code_block_markdown))
-                       # Add function result to input for next iteration (stripped version)
-                        input_list.append({
-                            "type": "function_call_output",
-                            "call_id": item.call_id,
-                            "output": result_text_for_context
-                        })
-                    if item.name == "research_agent":
-                        research_result = research_agent(analysis_query)
-                        # Add function result to input for next iteration
-                        input_list.append({
-                            "type": "function_call_output",
-                            "call_id": item.call_id,
-                            "output": research_result
-                        })
-                        
+        # Stream with tools enabled; the LLM slot is held only while the stream is open,
+        # not while tools run below. Queuing for it happens on the event loop, so a
+        # waiting chat doesn't occupy a threadpool worker.
+        turn = {}
+        async with llm_limiter.slot(user_id):
+            async for line in iterate_in_threadpool(_stream_turn(model_name, input_list, turn)):
+                yield line
+        final_response = turn["response"]
+        input_list += final_response.output
+        # function calls 
+        for item in final_response.output:
+            if item.type == "function_call":
+                has_function_call = True 
+                args = json.loads(item.arguments)
+                analysis_query = args.get("query")
+                    
+                if item.name == "coding_agent":
+                    stdout, stderr, code_str, artifacts = await run_coding_agent(analysis_query, files_dict, user_id)
+
+                    stdout_text = "\n".join(stdout) if stdout else ""
+                    errors_text = "\n".join(stderr) if stderr else ""
+
+                    def join_output(rendered_artifacts: str) -> str:
+                        section = "\n\n".join(p for p in (stdout_text, rendered_artifacts) if p)
+                        if errors_text:
+                            section += ("\n\nErrors:\n" if section else "Errors:\n") + errors_text
+                        return section
+
+                    # Artifacts stay typed (PNG bytes, capped tables) until here, the edge:
+                    # the client gets inline images, the model only placeholders.
+                    # strip_base64_images still covers charts printed to stdout.
+                    output_section = join_output(render_artifacts(artifacts))
+                    output_for_model = strip_base64_images(join_output(render_artifacts(artifacts, for_model=True)))
+                    result_text_for_context = f"Output:\n{output_for_model}\n\nCode Executed:\n{code_str}"
+
+                    # Inject the FULL code block (with base64) into the CLIENT stream
+                    # This makes it appear in the chat UI with charts intact
+                    # Format: python-exec with delimiter to pass both code and output
+                    if code_str:
+                        # Combine code and output with simple delimiter (FULL output with images)
+                        combined = f"{code_str.strip()}\n---OUTPUT---\n{output_section.strip()}"
+                        code_block_markdown = f"\n```python-exec\n{combined}\n```\n\n"
+                        yield '0:{text}\n'.format(text=json.dumps(code_block_markdown))
+                   # Add function result to input for next iteration (stripped version)
+                    input_list.append({
+                        "type": "function_call_output",
+                        "call_id": item.call_id,
+                        "output": result_text_for_context
+                    })
+                if item.name == "research_agent":
+                    research_result = await run_research_agent(analysis_query, user_id)
+                    # Add function result to input for next iteration
+                    input_list.append({
+                        "type": "function_call_output",
+                        "call_id": item.call_id,
+                        "output": research_result
+                    })
+                    
         if not has_function_call:
             break 
 
@@ -243,16 +325,54 @@ async def upload_file(file: UploadFile = File(...)):
     file_location = f"api/uploads/{file.filename}"
     with open(file_location, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
+
+    # Refresh the cached profile now; re-uploads with appended rows only parse the new tail
+    profile = None
+    if file.filename.lower().endswith(".csv"):
+        try:
+            # Full profiles parse the whole CSV; keep that off the event loop
+            profile = await run_in_threadpool(profile_file, file_location)
+            print(f"📊 Profiled {file.filename}: {profile['mode']}, {profile['rows']} rows "
+                  f"(+{profile['appended_rows']} appended)", flush=True)
+        except Exception as e:
+            print(f"⚠️ Could not profile {file.filename}: {e}", flush=True)
     
     # Construct URL suitable for local dev
     # In production, this would need to use the actual domain
     url = f"http://127.0.0.1:8000/uploads/{file.filename}"
     
-    return {"url": url, "name": file.filename, "type": file.content_type}
+    return {
+        "url": url,
+        "name": file.filename,
+        "type": file.content_type,
+        "rows": profile["rows"] if profile else None,
+        "appended_rows": profile["appended_rows"] if profile else None,
+    }
+
+
+def client_key(http_request: HTTPRequest) -> Optional[str]:
+    """
+    Per-user key for admission fairness: the frontend's x-user-id, else the
+    original client from X-Forwarded-For (requests arrive via the Vercel/Railway
+    proxies), and only then the socket peer.
+    """
+    user_id = http_request.headers.get("x-user-id", "").strip()
+    if user_id:
+        return f"id:{user_id[:128]}"
+    forwarded = http_request.headers.get("x-forwarded-for", "").split(",")[0].strip()
+    if forwarded:
+        return f"ip:{forwarded}"
+    return f"ip:{http_request.client.host}" if http_request.client else None
+
+
+@app.get("/api/admission")
+async def admission_metrics():
+    """Current concurrency and queue-time metrics for LLM streams and sandboxes."""
+    return admission_stats()
 
 
 @app.post("/api/chat")
-async def handle_chat_data(request: Request):
+async def handle_chat_data(request: Request, http_request: HTTPRequest):
     print("\n🚀 /api/chat endpoint hit!", flush=True)
     messages = request.messages
     print(f"📨 Received {len(messages)} messages", flush=True)
@@ -265,8 +385,10 @@ async def handle_chat_data(request: Request):
     openai_messages = convert_to_openai_messages(messages)
     print(f"✅ Converted to {len(openai_messages)} OpenAI messages", flush=True)
 
+    user_id = client_key(http_request)
+
     response = StreamingResponse(
-        stream_text(openai_messages, files_dict),
+        stream_text(openai_messages, files_dict, user_id),
         media_type="text/plain",
     )
     response.headers['x-vercel-ai-data-stream'] = 'v1'
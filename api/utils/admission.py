@@ -0,0 +1,203 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from .config import env_int, env_float
+
+
+class SystemBusy(Exception):
+    """Raised when a limiter cannot admit more work (queue full or wait timed out)."""
+
+    def __init__(self, resource: str, reason: str):
+        super().__init__(f"{resource} is saturated ({reason})")
+        self.resource = resource
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future", "granted", "enqueued_at")
+
+    def __init__(self, user_id: str, future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class FairLimiter:
+    """
+    Global + per-user concurrency limit with a bounded, round-robin wait queue.
+
+    Work from a single busy user cannot starve everyone else: when a slot frees
+    up, waiters are served one user at a time in rotation rather than FIFO.
+    Waiting happens on the event loop, so queued requests don't hold one of
+    Starlette's threadpool workers and rejection stays immediate. All methods
+    must be called from the event loop thread.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, per_user: int,
+                 max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.per_user = per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._active_by_user = {}
+        self._queues = OrderedDict()  # user_id -> deque[_Waiter], rotation order
+        self._queued = 0
+
+        # Metrics
+        self._admitted = 0
+        self._rejected = 0
+        self._waits = deque(maxlen=1000)
+
+    def _has_room(self, user_id: str) -> bool:
+        return (self._active < self.max_concurrent
+                and self._active_by_user.get(user_id, 0) < self.per_user)
+
+    def _grant(self, user_id: str):
+        self._active += 1
+        self._active_by_user[user_id] = self._active_by_user.get(user_id, 0) + 1
+        self._admitted += 1
+
+    def _withdraw(self, waiter: _Waiter):
+        waiters = self._queues.get(waiter.user_id)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[waiter.user_id]
+
+    def _dispatch(self):
+        """Hand free slots to queued waiters, one user per turn (round-robin)."""
+        for _ in range(len(self._queues)):
+            if self._active >= self.max_concurrent:
+                return
+            user_id, waiters = self._queues.popitem(last=False)
+            # Drop waiters that timed out or were cancelled but haven't withdrawn yet
+            while waiters and waiters[0].future.done():
+                waiters.popleft()
+                self._queued -= 1
+            if waiters and self._has_room(user_id):
+                waiter = waiters.popleft()
+                self._queued -= 1
+                self._grant(user_id)
+                waiter.granted = True
+                self._waits.append(time.monotonic() - waiter.enqueued_at)
+                waiter.future.set_result(None)
+            if waiters:
+                self._queues[user_id] = waiters
+
+    async def acquire(self, user_id: str):
+        # Only skip the queue when nobody from this user is already waiting,
+        # otherwise a new request could overtake older ones.
+        if self._has_room(user_id) and user_id not in self._queues:
+            self._grant(user_id)
+            self._waits.append(0.0)
+            return
+        if self._queued >= self.max_queue:
+            self._rejected += 1
+            raise SystemBusy(self.name, "queue full")
+
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.granted:
+                return
+            self._withdraw(waiter)
+            self._rejected += 1
+            # Count the time spent waiting too, or percentiles read low under saturation
+            self._waits.append(time.monotonic() - waiter.enqueued_at)
+            raise SystemBusy(self.name, "queue timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued (or right after being granted)
+            if waiter.granted:
+                self.release(user_id)
+            else:
+                self._withdraw(waiter)
+            raise
+
+    def release(self, user_id: str):
+        self._active -= 1
+        remaining = self._active_by_user.get(user_id, 1) - 1
+        if remaining:
+            self._active_by_user[user_id] = remaining
+        else:
+            self._active_by_user.pop(user_id, None)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id: Optional[str]):
+        user_id = user_id or "anonymous"
+        await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release(user_id)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "per_user": self.per_user,
+            "max_queue": self.max_queue,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "queue_time_p50": pct(0.50),
+            "queue_time_p95": pct(0.95),
+            "queue_time_max": round(waits[-1], 4) if waits else 0.0,
+        }
+
+
+llm_limiter = FairLimiter(
+    "llm",
+    max_concurrent=env_int("MAX_LLM_STREAMS", 16),
+    per_user=env_int("MAX_LLM_STREAMS_PER_USER", 2),
+    max_queue=env_int("MAX_LLM_QUEUE", 64),
+    queue_timeout=env_float("LLM_QUEUE_TIMEOUT", 10.0),
+)
+
+sandbox_limiter = FairLimiter(
+    "sandbox",
+    max_concurrent=env_int("MAX_SANDBOXES", 8),
+    per_user=env_int("MAX_SANDBOXES_PER_USER", 1),
+    max_queue=env_int("MAX_SANDBOX_QUEUE", 32),
+    queue_timeout=env_float("SANDBOX_QUEUE_TIMEOUT", 20.0),
+)
+
+# Threadpool workers kept free beyond admitted work (uploads, file summaries, ...)
+THREADPOOL_HEADROOM = 8
+
+
+def ensure_threadpool_capacity():
+    """
+    Admitted LLM streams and sandbox runs each occupy a threadpool worker while
+    active. Grow anyio's default thread limiter (40) if the configured limits
+    plus headroom would not fit. Call from the event loop at startup.
+    """
+    import anyio.to_thread
+
+    needed = llm_limiter.max_concurrent + sandbox_limiter.max_concurrent + THREADPOOL_HEADROOM
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    if limiter.total_tokens < needed:
+        print(f"⚙️ Raising threadpool size {limiter.total_tokens} -> {needed} to fit admission limits", flush=True)
+        limiter.total_tokens = needed
+
+
+def admission_stats() -> dict:
+    return {"llm": llm_limiter.stats(), "sandbox": sandbox_limiter.stats()}
@@ -1,12 +1,93 @@
-import os
-from dotenv import load_dotenv
-from e2b_code_interpreter import Sandbox
-import requests
+import base64
+from dataclasses import dataclass, field
 import re 
-from typing import Optional 
+from typing import List, Optional 
 
-load_dotenv()
-api_key = os.environ.get("E2B_API_KEY")
+from .config import E2B_API_KEY
+
+# Tables coming back from the sandbox are capped to this many rows
+MAX_TABLE_ROWS = 50
+
+
+@dataclass
+class ImageArtifact:
+    """A chart/image produced in the sandbox, kept as raw bytes."""
+    data: bytes
+    mime: str = "image/png"
+    alt: str = "chart"
+
+
+@dataclass
+class TableArtifact:
+    """A displayed DataFrame, kept as columns + a row-limited list of rows."""
+    columns: List[str]
+    rows: List[list]
+    total_rows: int
+    index: List = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_rows > len(self.rows)
+
+
+def _table_from_data(data: dict) -> Optional[TableArtifact]:
+    """
+    Build a TableArtifact from the sandbox's structured DataFrame payload.
+    Accepts the column-wise form ({col: [values]}), pandas' "split" orient
+    ({columns, index, data}) and the dict-of-dicts form ({col: {idx: value}}).
+    """
+    if not isinstance(data, dict) or not data:
+        return None
+    if all(isinstance(v, list) for v in data.values()):
+        # Cap each column before transposing so only MAX_TABLE_ROWS rows are built
+        columns = [str(c) for c in data]
+        total_rows = max(len(v) for v in data.values())
+        capped = [v[:MAX_TABLE_ROWS] for v in data.values()]
+        rows = [list(r) for r in zip(*capped)]
+        return TableArtifact(columns=columns, rows=rows, total_rows=total_rows)
+    if "columns" in data and "data" in data:
+        rows = list(data["data"])
+        index = list(data.get("index") or [])
+        columns = [str(c) for c in data["columns"]]
+    elif all(isinstance(v, dict) for v in data.values()):
+        columns = [str(c) for c in data]
+        index = list(next(iter(data.values())).keys())
+        rows = [[data[c].get(i) for c in data] for i in index]
+    else:
+        return None
+    return TableArtifact(
+        columns=columns,
+        rows=[list(r) for r in rows[:MAX_TABLE_ROWS]],
+        total_rows=len(rows),
+        index=index[:MAX_TABLE_ROWS],
+    )
+
+
+def collect_artifacts(results) -> list:
+    """
+    Convert E2B rich results into typed artifacts: ImageArtifact (raw bytes),
+    TableArtifact (row-capped) or, failing both, the result's plain text.
+    """
+    artifacts = []
+    for result in results or []:
+        if getattr(result, "png", None):
+            artifacts.append(ImageArtifact(data=base64.b64decode(result.png)))
+        elif getattr(result, "jpeg", None):
+            artifacts.append(ImageArtifact(data=base64.b64decode(result.jpeg), mime="image/jpeg"))
+        else:
+            table = _table_from_data(getattr(result, "data", None))
+            if table is not None:
+                artifacts.append(table)
+            elif getattr(result, "text", None):
+                # No structured payload (e.g. a displayed scalar): keep the plain text repr
+                artifacts.append(result.text)
+    return artifacts
+
+
+def _sandbox_cls():
+    # The E2B SDK is slow to import and only needed once a tool call runs
+    from e2b_code_interpreter import Sandbox
+    return Sandbox
 
 
 class DataAnalysisSession:
@@ -16,7 +97,7 @@ class DataAnalysisSession:
     """
     
     def __init__(self):
-        self.api_key = api_key
+        self.api_key = E2B_API_KEY
         self.sandbox = None
     
     def init_session(self, files: dict = None):
@@ -28,12 +109,13 @@ class DataAnalysisSession:
                    e.g., {"data.csv": "https://blob.vercelusercontent.com/..."}
                    or {"data.csv": "/local/path/to/file.csv"}
         """
-        self.sandbox = Sandbox.create(api_key=self.api_key)
+        self.sandbox = _sandbox_cls().create(api_key=self.api_key)
         
         if files:
             for sandbox_path, source_path in files.items():
                 # Handle blob URLs
                 if source_path.startswith(("http://", "https://")):
+                    import requests
                     response = requests.get(source_path)
                     self.sandbox.files.write(sandbox_path, response.content)
                 # Handle local file paths
@@ -51,13 +133,14 @@ class DataAnalysisSession:
             code: Python code to execute
             
         Returns:
-            tuple: (stdout, stderr) as lists of strings
+            tuple: (stdout, stderr, artifacts) - stdout/stderr as lists of strings,
+                   artifacts as returned by collect_artifacts()
         """
         if not self.sandbox:
             raise RuntimeError("Session not initialized. Call init_session() first.")
         
         execution = self.sandbox.run_code(code)
-        return execution.logs.stdout, execution.logs.stderr
+        return execution.logs.stdout, execution.logs.stderr, collect_artifacts(execution.results)
     
     def close(self):
         """Clean up and close the sandbox session."""
@@ -111,7 +194,7 @@ print("Correlation with pts (top 10):")
 print(corr.head(10))
 """
     
-    stdout, stderr = session.execute_code(code1)
+    stdout, stderr, artifacts = session.execute_code(code1)
     print("=== Query 1 ===")
     print("STDOUT:")
     print("\n".join(stdout))
@@ -126,7 +209,7 @@ print("Shape:", df.shape)
 print("Data types:", df.dtypes.to_dict())
 """
     
-    stdout, stderr = session.execute_code(code2)
+    stdout, stderr, artifacts = session.execute_code(code2)
     print("\n=== Query 2 ===")
     print("STDOUT:")
     print("\n".join(stdout))
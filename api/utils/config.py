@@ -0,0 +1,33 @@
+"""
+Process-wide configuration and lazily created clients.
+
+The .env file is loaded exactly once, here. Clients for heavy SDKs (OpenAI)
+are only imported and constructed on first use so cold starts stay cheap;
+see benchmarks/bench_startup.py for the import-time budget.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+E2B_API_KEY = os.environ.get("E2B_API_KEY")
+
+_openai_client = None
+
+
+def get_openai_client():
+    """Shared OpenAI client, created (and the SDK imported) on first call."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
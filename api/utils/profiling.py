@@ -0,0 +1,257 @@
+"""
+Cached, append-aware dataset profiles for uploaded CSV files.
+
+A profile (row count, dtypes, null counts, numeric min/max, sample rows) is
+stored next to the uploads as JSON together with the file's size and SHA-256.
+When a file is re-uploaded with rows appended (e.g. a new season added to
+all_seasons.csv), the stored hash is compared against the same-length prefix
+of the new file; if it matches, only the new tail is parsed and merged into
+the cached statistics, so refresh cost scales with the new data.
+"""
+import copy
+import hashlib
+import io
+import json
+import os
+import tempfile
+from typing import Optional
+
+PROFILE_DIR = "api/.profile_cache"
+PROFILE_VERSION = 1
+CHUNK_ROWS = 100_000
+SAMPLE_ROWS = 5
+_READ_BLOCK = 1 << 20
+
+STATS_KEYS = ("rows", "columns", "dtypes", "nulls", "min", "max", "sample")
+
+
+def _profile_path(path: str) -> str:
+    return os.path.join(PROFILE_DIR, os.path.basename(path) + ".json")
+
+
+def load_profile(path: str) -> Optional[dict]:
+    try:
+        with open(_profile_path(path)) as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == PROFILE_VERSION else None
+
+
+def _save_profile(path: str, profile: dict):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # Unique temp file per writer: uploads and chats may profile the same CSV at once
+    fd, tmp = tempfile.mkstemp(dir=PROFILE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, _profile_path(path))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _scalar(value):
+    """numpy scalar -> plain JSON-safe Python value."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _is_numeric(dtype: str) -> bool:
+    return dtype.startswith(("int", "uint", "float"))
+
+
+def _empty_stats(columns: list) -> dict:
+    return {
+        "rows": 0,
+        "columns": columns,
+        "dtypes": {},
+        "nulls": {c: 0 for c in columns},
+        "min": {},
+        "max": {},
+        "sample": [],
+    }
+
+
+def _merged_dtype(previous: Optional[str], chunk_dtype: str, all_null: bool,
+                  seen_values: bool, had_nulls: bool) -> str:
+    """
+    Combine a column's running dtype with a new chunk's, mirroring what pandas
+    would infer for the whole file: nulls widen ints to float64, an all-null
+    column is float64, and numbers mixed with text take the text dtype.
+    """
+    if all_null:
+        if previous is None or previous.startswith(("int", "uint")):
+            return "float64"
+        return previous
+    if not seen_values:
+        # Only nulls so far: the chunk's values decide, widened if nulls exist
+        if had_nulls and chunk_dtype.startswith(("int", "uint")):
+            return "float64"
+        return chunk_dtype
+    if previous == chunk_dtype:
+        return previous
+    if _is_numeric(previous) and _is_numeric(chunk_dtype):
+        return "float64"
+    # Numbers mixed with text parse as text; keep the text side's dtype (str/object)
+    if _is_numeric(previous):
+        return chunk_dtype
+    if _is_numeric(chunk_dtype):
+        return previous
+    return "object"
+
+
+def _normalize_sample(stats: dict):
+    """Re-type sample values to the final column dtypes, as a full parse would show them."""
+    for row in stats["sample"]:
+        for column, value in row.items():
+            dtype = stats["dtypes"].get(column, "")
+            if value is None or isinstance(value, bool):
+                continue
+            if dtype.startswith("float") and isinstance(value, int):
+                row[column] = float(value)
+            elif dtype and not _is_numeric(dtype) and isinstance(value, (int, float)):
+                row[column] = str(value)
+
+
+def _merge_chunk(stats: dict, df):
+    """Fold one parsed DataFrame chunk into running stats, in place."""
+    if df.empty:
+        # A header-only file parses as 0 object-typed rows; that says nothing about dtypes
+        return
+    missing = SAMPLE_ROWS - len(stats["sample"])
+    if missing > 0:
+        stats["sample"].extend(json.loads(df.head(missing).to_json(orient="records")))
+    rows_before = stats["rows"]
+    stats["rows"] += len(df)
+
+    for column in stats["columns"]:
+        series = df[column]
+        nulls_before = stats["nulls"][column]
+        chunk_nulls = int(series.isna().sum())
+        stats["nulls"][column] += chunk_nulls
+
+        stats["dtypes"][column] = _merged_dtype(
+            stats["dtypes"].get(column),
+            str(series.dtype),
+            all_null=chunk_nulls == len(series),
+            seen_values=nulls_before < rows_before,
+            had_nulls=nulls_before > 0,
+        )
+
+        if not _is_numeric(stats["dtypes"][column]):
+            stats["min"].pop(column, None)
+            stats["max"].pop(column, None)
+            continue
+        if series.notna().any():
+            lo, hi = _scalar(series.min()), _scalar(series.max())
+            stats["min"][column] = lo if column not in stats["min"] else min(stats["min"][column], lo)
+            stats["max"][column] = hi if column not in stats["max"] else max(stats["max"][column], hi)
+
+
+def _full_profile(path: str) -> dict:
+    import pandas as pd
+
+    stats = None
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS):
+        if stats is None:
+            stats = _empty_stats([str(c) for c in chunk.columns])
+        chunk.columns = stats["columns"]
+        _merge_chunk(stats, chunk)
+    if stats is None:
+        stats = _empty_stats([str(c) for c in pd.read_csv(path, nrows=0).columns])
+    return stats
+
+
+def _append_tail(profile: dict, tail: bytes) -> dict:
+    import pandas as pd
+
+    stats = copy.deepcopy({k: profile[k] for k in STATS_KEYS})
+    # No names= here: with names pandas would shift rows that have extra fields
+    # onto a synthetic index. Parsing raw makes a ragged tail raise, or show up
+    # as a column-count mismatch, like it would in a full parse.
+    reader = pd.read_csv(io.BytesIO(tail), header=None, chunksize=CHUNK_ROWS)
+    for chunk in reader:
+        if chunk.shape[1] != len(stats["columns"]):
+            raise ValueError(
+                f"Appended rows have {chunk.shape[1]} fields, expected {len(stats['columns'])}"
+            )
+        chunk.columns = stats["columns"]
+        _merge_chunk(stats, chunk)
+    return stats
+
+
+def _hash_file(path: str, prefix_size: Optional[int]):
+    """
+    Hash the whole file in one pass, also returning the digest of its first
+    `prefix_size` bytes (for append detection) and the bytes after it.
+    """
+    hasher = hashlib.sha256()
+    prefix_digest = None
+    tail = io.BytesIO()
+    offset = 0
+    last_byte = b""
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_READ_BLOCK)
+            if not block:
+                break
+            if prefix_size is not None and offset < prefix_size <= offset + len(block):
+                cut = prefix_size - offset
+                hasher.update(block[:cut])
+                prefix_digest = hasher.hexdigest()
+                hasher.update(block[cut:])
+                tail.write(block[cut:])
+            else:
+                hasher.update(block)
+                if prefix_digest is not None:
+                    tail.write(block)
+            offset += len(block)
+            last_byte = block[-1:]
+    return hasher.hexdigest(), prefix_digest, tail.getvalue(), last_byte == b"\n"
+
+
+def profile_file(path: str) -> dict:
+    """
+    Return the profile for a CSV file, reusing or incrementally updating the
+    cached one. The result's "mode" is "cached", "append" or "full".
+    """
+    stat = os.stat(path)
+    cached = load_profile(path)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return dict(cached, mode="cached")
+
+    can_append = (
+        bool(cached) and cached["size"] > 0 and cached["ends_with_newline"]
+        and stat.st_size >= cached["size"]
+    )
+    digest, prefix_digest, tail, ends_with_newline = _hash_file(
+        path, cached["size"] if can_append else None
+    )
+
+    appended_rows = 0
+    if can_append and prefix_digest == cached["sha256"]:
+        mode = "append"
+        try:
+            stats = _append_tail(cached, tail) if tail.strip() else {k: cached[k] for k in STATS_KEYS}
+            appended_rows = stats["rows"] - cached["rows"]
+        except ValueError:
+            # Malformed tail (pandas ParserError is a ValueError): re-profile from
+            # scratch so the result (or error) matches a full parse exactly
+            mode = "full"
+            stats = _full_profile(path)
+    else:
+        mode = "full"
+        stats = _full_profile(path)
+
+    _normalize_sample(stats)
+    profile = dict(
+        stats,
+        version=PROFILE_VERSION,
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        sha256=digest,
+        ends_with_newline=ends_with_newline,
+        appended_rows=appended_rows,
+    )
+    _save_profile(path, profile)
+    return dict(profile, mode=mode)
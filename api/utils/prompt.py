@@ -1,5 +1,4 @@
 import json
-from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from pydantic import BaseModel
 import base64
 from typing import List, Optional
@@ -0,0 +1,233 @@
+"""
+End-to-end benchmark / load test for POST /api/chat, fully offline.
+
+Drives the real FastAPI app in-process over ASGI with the OpenAI client and the
+E2B Sandbox swapped for the deterministic fakes in benchmarks/fakes.py, so the
+whole stream_text -> coding_agent -> DataAnalysisSession path is exercised
+against the bundled api/uploads/all_seasons.csv.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_chat --requests 40 --concurrency 8
+    python -m benchmarks.bench_chat --sandbox-exec 1.5 --compare latest
+
+Each run is written to benchmarks/results/chat-<timestamp>.json (gitignored,
+local history only); pass --compare <file|latest> to diff against an earlier
+run. --heap adds a separate, untimed pass measuring peak Python heap.
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FakeLatency, FakeOpenAI, FakeSandbox
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DATASET = "all_seasons.csv"
+
+
+def _payload(i: int) -> bytes:
+    return json.dumps({
+        "messages": [{
+            "role": "user",
+            "content": "What is the average pts per season over the last five seasons?",
+            "experimental_attachments": [{
+                "name": DATASET,
+                "contentType": "text/csv",
+                "url": f"http://127.0.0.1:8000/uploads/{DATASET}",
+            }],
+        }]
+    }).encode()
+
+
+async def _one_request(app, i: int) -> dict:
+    """Call the ASGI app directly, timestamping the first and last body chunk."""
+    body = _payload(i)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat",
+        "raw_path": b"/api/chat",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            # One simulated user per request so per-user limits don't serialize the run
+            (b"x-user-id", f"bench-{i}".encode()),
+        ],
+        "client": ("127.0.0.1", 50000 + i),
+        "server": ("127.0.0.1", 8000),
+    }
+    sent = False
+    never = asyncio.Event()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await never.wait()
+
+    start = time.perf_counter()
+    ttfb = None
+    status = None
+    chunks = []
+
+    async def send(message):
+        nonlocal ttfb, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            chunks.append(message["body"])
+
+    await app(scope, receive, send)
+    total = time.perf_counter() - start
+    text = b"".join(chunks).decode()
+    return {
+        "status": status,
+        "ttfb": ttfb if ttfb is not None else total,
+        "total": total,
+        "bytes": len(text),
+        "busy": '"busy":true' in text,
+        "ok": status == 200 and '"finishReason":"stop"' in text,
+    }
+
+
+async def _run(app, n_requests: int, concurrency: int) -> list:
+    queue = asyncio.Queue()
+    for i in range(n_requests):
+        queue.put_nowait(i)
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            results.append(await _one_request(app, queue.get_nowait()))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def _percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+
+def _summarize(results: list, wall: float) -> dict:
+    summary = {"requests": len(results), "wall_seconds": round(wall, 3)}
+    summary["ok"] = sum(r["ok"] for r in results)
+    summary["busy"] = sum(r["busy"] for r in results)
+    summary["throughput_rps"] = round(len(results) / wall, 3) if wall else 0.0
+    for key in ("ttfb", "total"):
+        values = [r[key] for r in results]
+        for p in (0.50, 0.95, 0.99):
+            summary[f"{key}_p{int(p * 100)}"] = round(_percentile(values, p), 4)
+    summary["avg_response_bytes"] = round(sum(r["bytes"] for r in results) / max(len(results), 1))
+    return summary
+
+
+def _load_app(latency: FakeLatency):
+    os.environ.setdefault("OPENAI_API_KEY", "bench-offline")
+    os.environ.setdefault("E2B_API_KEY", "bench-offline")
+    import api.index as index
+    import api.utils.code_execution as code_execution
+    import api.utils.config as config
+
+    config._openai_client = FakeOpenAI(latency)
+    fake_sandbox = FakeSandbox.using(latency)
+    code_execution._sandbox_cls = lambda: fake_sandbox
+    return index.app
+
+
+def _compare(current: dict, path: str):
+    if path == "latest":
+        previous = sorted(glob.glob(os.path.join(RESULTS_DIR, "chat-*.json")))
+        if not previous:
+            print("No previous results to compare against.")
+            return
+        path = previous[-1]
+    with open(path) as f:
+        baseline = json.load(f)["summary"]
+    print(f"\nCompared with {os.path.basename(path)}:")
+    for key, value in current.items():
+        before = baseline.get(key)
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+            change = (value - before) / before * 100
+            print(f"  {key:<22} {before:>12} -> {value:<12} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    defaults = FakeLatency()
+    for field in defaults.__dataclass_fields__:
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=getattr(defaults, field),
+                            help=f"fake latency in seconds (default {getattr(defaults, field)})")
+    parser.add_argument("--compare", help="results JSON to diff against, or 'latest'")
+    parser.add_argument("--heap", action="store_true",
+                        help="also measure peak Python heap in a separate, untimed tracemalloc pass")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    latency = FakeLatency(**{f: getattr(args, f) for f in defaults.__dataclass_fields__})
+    # The app resolves uploads relative to the repo root
+    os.chdir(REPO_ROOT)
+    app = _load_app(latency)
+
+    start = time.perf_counter()
+    # The app logs heavily to stdout; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(_run(app, args.requests, args.concurrency))
+    wall = time.perf_counter() - start
+
+    summary = _summarize(results, wall)
+    summary["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+    if args.heap:
+        # tracemalloc slows every allocation, so it never runs during the timed pass
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(_run(app, args.requests, args.concurrency))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        summary["python_peak_mb"] = round(peak / 2**20, 2)
+
+    print(f"/api/chat  requests={args.requests}  concurrency={args.concurrency}")
+    for key, value in summary.items():
+        print(f"  {key:<22} {value}")
+
+    if args.compare:
+        _compare(summary, args.compare)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, time.strftime("chat-%Y%m%d-%H%M%S.json"))
+        with open(path, "w") as f:
+            json.dump({
+                "config": {"requests": args.requests, "concurrency": args.concurrency,
+                           "latency": vars(latency)},
+                "summary": summary,
+            }, f, indent=2)
+        print(f"\nSaved {os.path.relpath(path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start budget check for the API process.
+
+Imports api.index in fresh interpreters (as a serverless cold start would),
+reports the median import time and the slowest modules from `-X importtime`,
+and fails if the time exceeds the budget or if a heavy dependency that should
+be lazily loaded gets imported eagerly.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget-ms 300 --runs 10
+
+Exits non-zero when the budget is exceeded, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Only needed once a chat actually calls a tool / the model; must not load at import
+LAZY_MODULES = ["pandas", "numpy", "openai", "e2b_code_interpreter", "requests"]
+
+DEFAULT_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 500))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import api.index
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({"ms": elapsed, "eager": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench-offline")
+    env.setdefault("E2B_API_KEY", "bench-offline")
+    return env
+
+
+def _probe() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _slowest_imports(limit: int) -> list:
+    """Top modules by cumulative import time, parsed from `python -X importtime`."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api.index"],
+                         cwd=REPO_ROOT, env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    # Only top-level packages, so a package isn't listed once per submodule
+    top = [(us, name) for us, name in rows if "." not in name]
+    return sorted(top, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"max median import time (default {DEFAULT_BUDGET_MS:g}, env STARTUP_BUDGET_MS)")
+    parser.add_argument("--top", type=int, default=10, help="how many slow imports to list")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    probes = [_probe() for _ in range(args.runs)]
+    times = [p["ms"] for p in probes]
+    eager = sorted({m for p in probes for m in p["eager"]})
+    median = statistics.median(times)
+
+    print(f"import api.index  runs={args.runs}")
+    print(f"  median_ms              {median:.1f}")
+    print(f"  min_ms                 {min(times):.1f}")
+    print(f"  max_ms                 {max(times):.1f}")
+    print(f"  budget_ms              {args.budget_ms:g}")
+    print("\nSlowest top-level imports (cumulative):")
+    for us, name in _slowest_imports(args.top):
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f"median import time {median:.1f} ms exceeds budget {args.budget_ms:g} ms")
+    if eager:
+        failures.append(f"lazily-loaded modules imported at startup: {', '.join(eager)}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, time.strftime("startup-%Y%m%d-%H%M%S.json"))
+        with open(path, "w") as f:
+            json.dump({"runs": times, "median_ms": median, "budget_ms": args.budget_ms,
+                       "eager": eager}, f, indent=2)
+        print(f"\nSaved {os.path.relpath(path)}")
+
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("\nOK: within startup budget")
+
+
+if __name__ == "__main__":
+    main()
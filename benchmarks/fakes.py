@@ -0,0 +1,157 @@
+"""
+Deterministic offline stand-ins for the OpenAI Responses API and the E2B sandbox.
+
+They reproduce just enough of each SDK's surface for the real
+stream_text -> coding_agent -> DataAnalysisSession path to run unchanged,
+with configurable latencies so the benchmark can model slow providers.
+"""
+import base64
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+
+@dataclass
+class FakeLatency:
+    """All values in seconds."""
+    llm_first_token: float = 0.30
+    llm_per_token: float = 0.01
+    llm_codegen: float = 0.80
+    sandbox_create: float = 0.50
+    sandbox_upload: float = 0.05
+    sandbox_exec: float = 0.40
+
+
+FAKE_CODE = """```python
+import pandas as pd
+import matplotlib.pyplot as plt
+
+df = pd.read_csv("all_seasons.csv")
+print("Shape:", df.shape)
+recent = df.groupby("season", as_index=False)["pts"].mean().tail(5)
+display(recent)
+recent.plot(x="season", y="pts", kind="bar")
+plt.show()
+```"""
+
+FAKE_STDOUT = ["Shape: (12844, 22)\n"]
+
+# Rich results as the sandbox reports them: a displayed DataFrame (column-wise
+# {col: [values]} payload) and a matplotlib figure (base64 PNG; a fixed-size
+# blob stands in for real image data)
+FAKE_TABLE = {
+    "season": ["2018-19", "2019-20", "2020-21", "2021-22", "2022-23"],
+    "pts": [8.43, 8.87, 8.95, 8.32, 8.96],
+}
+FAKE_PNG = base64.b64encode(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 160).decode()
+
+FAKE_ANSWER = (
+    "Average points per player have hovered around 8-9 per game over the last "
+    "five seasons, peaking in 2022-23 at roughly 8.96."
+)
+
+
+def _tokens(text: str):
+    # Split into word-sized deltas the way the real stream chunks text
+    words = text.split(" ")
+    return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+
+class _FakeStream:
+    def __init__(self, latency: FakeLatency, input_list):
+        self.latency = latency
+        # First turn asks for the coding tool; once a tool result is present, answer
+        self.call_tool = not any(
+            isinstance(item, dict) and item.get("type") == "function_call_output"
+            for item in input_list
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        time.sleep(self.latency.llm_first_token)
+        if self.call_tool:
+            yield SimpleNamespace(type="response.function_call_arguments.done")
+            return
+        for token in _tokens(FAKE_ANSWER):
+            yield SimpleNamespace(type="response.output_text.delta", delta=token)
+            time.sleep(self.latency.llm_per_token)
+
+    def get_final_response(self):
+        usage = SimpleNamespace(input_tokens=1200, output_tokens=60)
+        if self.call_tool:
+            item = SimpleNamespace(
+                type="function_call",
+                name="coding_agent",
+                call_id="call_bench",
+                arguments='{"query": "Average pts per season for the last five seasons"}',
+            )
+        else:
+            item = SimpleNamespace(
+                type="message",
+                content=[SimpleNamespace(type="output_text", text=FAKE_ANSWER, annotations=[])],
+            )
+        return SimpleNamespace(output=[item], usage=usage)
+
+
+class _FakeResponses:
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+
+    def stream(self, **kwargs):
+        return _FakeStream(self.latency, kwargs.get("input") or [])
+
+    def create(self, **kwargs):
+        time.sleep(self.latency.llm_codegen)
+        return SimpleNamespace(output_text=FAKE_CODE, output=[])
+
+
+class FakeOpenAI:
+    def __init__(self, latency: FakeLatency = None):
+        self.responses = _FakeResponses(latency or FakeLatency())
+
+
+class _FakeFiles:
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.written = {}
+
+    def write(self, path, data):
+        if hasattr(data, "read"):
+            data = data.read()
+        time.sleep(self.latency.sandbox_upload)
+        self.written[path] = len(data)
+
+
+class FakeSandbox:
+    """Drop-in for e2b_code_interpreter.Sandbox; bind latency with FakeSandbox.using()."""
+
+    latency = FakeLatency()
+
+    def __init__(self):
+        self.files = _FakeFiles(self.latency)
+
+    @classmethod
+    def using(cls, latency: FakeLatency):
+        return type("FakeSandbox", (cls,), {"latency": latency})
+
+    @classmethod
+    def create(cls, **kwargs):
+        time.sleep(cls.latency.sandbox_create)
+        return cls()
+
+    def run_code(self, code, **kwargs):
+        time.sleep(self.latency.sandbox_exec)
+        logs = SimpleNamespace(stdout=list(FAKE_STDOUT), stderr=[])
+        results = [
+            SimpleNamespace(data=FAKE_TABLE, png=None, jpeg=None, text="<DataFrame>"),
+            SimpleNamespace(data=None, png=FAKE_PNG, jpeg=None, text="<Figure>"),
+        ]
+        return SimpleNamespace(logs=logs, results=results, error=None)
+
+    def kill(self):
+        pass
@@ -8,6 +8,7 @@ import { MultimodalInput } from "@/components/multimodal-input";
 import { Overview } from "@/components/overview";
 import { useScrollToBottom } from "@/hooks/use-scroll-to-bottom";
 import { useChat } from "ai/react";
+import { getClientId } from "@/lib/utils";
 import { toast } from "sonner";
 
 export function Chat() {
@@ -17,6 +18,8 @@ export function Chat() {
     ? "http://127.0.0.1:8000"
     : process.env.RAILWAY_BACKEND_URL || "https://dataanalyst-production-2e27.up.railway.app";
 
+  const clientId = useMemo(() => getClientId(), []);
+
   const {
     messages,
     setMessages,
@@ -29,12 +32,15 @@ export function Chat() {
     stop,
   } = useChat({
     api: `${backendUrl}/api/chat`,
+    headers: clientId ? { "x-user-id": clientId } : undefined,
     maxSteps: 4,
     onError: (error: Error) => {
       if (error.message.includes("Too many requests")) {
         toast.error(
           "You are sending too many messages. Please try again later.",
         );
+      } else if (error.message.includes("Atlas is busy")) {
+        toast.error("Atlas is busy right now. Please try again in a moment.");
       }
     },
   });
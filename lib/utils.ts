@@ -9,3 +9,23 @@ export function cn(...inputs: ClassValue[]) {
 export function sanitizeUIMessages(messages: Array<Message>): Array<Message> {
   return messages.filter((message) => message.content.length > 0);
 }
+
+const CLIENT_ID_KEY = "atlas_client_id";
+
+/**
+ * Stable per-browser id sent as `x-user-id` so the backend can apply
+ * per-user concurrency limits (all traffic reaches it through one proxy).
+ */
+export function getClientId(): string | undefined {
+  if (typeof window === "undefined") return undefined;
+  try {
+    let id = localStorage.getItem(CLIENT_ID_KEY);
+    if (!id) {
+      id = crypto.randomUUID();
+      localStorage.setItem(CLIENT_ID_KEY, id);
+    }
+    return id;
+  } catch {
+    return undefined;
+  }
+}
@@ -10,7 +10,7 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api.tools.data_analyst_agent import execute_data_analysis
+from api.agents.coding_agent import coding_agent
 
 
 def test_natural_language_instructions():
@@ -21,7 +21,7 @@ def test_natural_language_instructions():
     
     # File to analyze
     files = {
-        "nba_seasons.csv": "api/uploads/nba_seasons.csv"
+        "all_seasons.csv": "api/uploads/all_seasons.csv"
     }
     
     # Natural language instructions (what the orchestrator would send)
@@ -37,30 +37,24 @@ def test_natural_language_instructions():
         print('='*60)
         
         try:
-            result = execute_data_analysis(
-                instructions=instructions,
-                files=files
-            )
-            
-            if result.get("error"):
-                print(f"❌ ERROR: {result['error']}")
-                continue
+            stdout, stderr, code, artifacts = coding_agent(instructions, files)
             
             print("\n✅ SUCCESS!")
             
-            if result.get("code"):
-                print("\n🐍 GENERATED CODE:")
-                for code_block in result["code"]:
-                    print(code_block[:300] + "..." if len(code_block) > 300 else code_block)
+            print("\n🐍 GENERATED CODE:")
+            print(code[:300] + "..." if len(code) > 300 else code)
             
-            if result.get("stdout"):
+            if stdout:
                 print("\n📊 OUTPUT:")
-                for line in result["stdout"]:
+                for line in stdout:
                     print(line)
             
-            if result.get("stderr") and any(err.strip() for err in result["stderr"]):
+            if artifacts:
+                print(f"\n🖼️  ARTIFACTS: {[type(a).__name__ for a in artifacts]}")
+            
+            if stderr and any(err.strip() for err in stderr):
                 print("\n⚠️  STDERR:")
-                for line in result["stderr"]:
+                for line in stderr:
                     if line.strip():
                         print(line)
         
@@ -76,16 +70,10 @@ if __name__ == "__main__":
     print("\n🚀 Starting Data Analyst Agent Tests\n")
     
     # Check if data file exists
-    if not os.path.exists("api/uploads/nba_seasons.csv"):
-        print("⚠️  Warning: Test data file not found at api/uploads/nba_seasons.csv")
-        print("Checking for alternative file...")
-        
-        if os.path.exists("api/uploads/all_seasons.csv"):
-            print("✓ Found all_seasons.csv, using that instead")
-            # This would work, just update the file reference in the test
-        else:
-            print("Please ensure a CSV file exists in api/uploads/ before running tests.\n")
-            sys.exit(1)
+    if not os.path.exists("api/uploads/all_seasons.csv"):
+        print("⚠️  Warning: Test data file not found at api/uploads/all_seasons.csv")
+        print("Please ensure a CSV file exists in api/uploads/ before running tests.\n")
+        sys.exit(1)
     
     # Run test
     test_natural_language_instructions()